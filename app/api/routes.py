@@ -1,15 +1,30 @@
-from uuid import uuid4
-from typing import Any, Dict
+import asyncio
+import itertools
+import secrets
+from typing import Dict, Type, TypeVar
 
-from fastapi import APIRouter, HTTPException
+import msgspec
+from fastapi import APIRouter, HTTPException, Request, Response
 
-from app.engine.models import GraphDefinition, WorkflowState, RunContext
-from app.engine.runner import run_graph
-from app.engine.registry import ToolRegistry
-from app.store.memory_store import graphs_store, runs_store
+from app.engine.models import GraphDefinition, RunBatchRequest, RunContext, RunRequest, WorkflowState
+from app.engine.runner import compile_graph, run_graph
+from app.engine.registry import condition_registry, default_tools, reducer_registry
+from app.store.memory_store import exec_store, graphs_store, get_run_json, save_run
 
 router = APIRouter()
 
+# Run/graph ids: random per-process prefix + monotonic counter + random suffix.
+# Zero-padding keeps ids from one process sorted by creation order. The counter
+# alone would let anyone holding one id enumerate other clients' runs via
+# GET /state, so each id also carries 32 random bits.
+_ID_PREFIX = secrets.token_hex(4)
+_ID_COUNTER = itertools.count()
+
+
+def _new_id() -> str:
+    """Return a new unique, creation-ordered, non-guessable id."""
+    return f"{_ID_PREFIX}{next(_ID_COUNTER):016x}{secrets.token_hex(4)}"
+
 
 def validate_graph_definition(definition: GraphDefinition) -> None:
     """Minimal validation for a GraphDefinition (student-level).
@@ -18,30 +33,40 @@ def validate_graph_definition(definition: GraphDefinition) -> None:
     1. start_node must be in nodes.
     2. Every edge key must be an existing node.
     3. default_next and branch targets must be valid node names (when not None).
+    4. reducer (when set) must be a registered reducer.
+    5. Every branch condition must be a registered condition, so the runner
+       never has to handle missing conditions.
     """
-    nodes = set(definition.nodes)
+    # Cached frozenset built by GraphDefinition.model_post_init
+    nodes = definition._node_set
 
     # 1) start_node must exist
     if definition.start_node not in nodes:
         raise HTTPException(status_code=400, detail="Invalid graph: start_node not found in nodes")
 
-    # 2) edge keys must be node names
-    for edge_node in definition.edges.keys():
-        if edge_node not in nodes:
-            raise HTTPException(status_code=400, detail=f"Invalid graph: edge for unknown node '{edge_node}'")
+    # 2) edge keys must be node names (set difference runs in C)
+    unknown = definition.edges.keys() - nodes
+    if unknown:
+        edge_node = next(k for k in definition.edges if k in unknown)
+        raise HTTPException(status_code=400, detail=f"Invalid graph: edge for unknown node '{edge_node}'")
 
-    # 3) default_next and branch targets must be valid node names (when not None)
+    # 3-5) targets, conditions and reducers, in a single pass over the edges
     for edge_node, edge_def in definition.edges.items():
         # default_next
-        default_next = getattr(edge_def, "default_next", None)
+        default_next = edge_def.default_next
         if default_next is not None and default_next not in nodes:
             raise HTTPException(status_code=400, detail=f"Invalid graph: default_next '{default_next}' for node '{edge_node}' not in nodes")
         # branches
-        branches = getattr(edge_def, "branches", []) or []
-        for br in branches:
-            target = getattr(br, "target", None)
-            if target is not None and target not in nodes:
+        for br in edge_def.branches:
+            target = br.target
+            if target not in nodes:
                 raise HTTPException(status_code=400, detail=f"Invalid graph: branch target '{target}' for node '{edge_node}' not in nodes")
+            if br.condition not in condition_registry:
+                raise HTTPException(status_code=400, detail=f"Invalid graph: unknown condition '{br.condition}' for node '{edge_node}'")
+        # reducer
+        reducer = edge_def.reducer
+        if reducer is not None and reducer not in reducer_registry:
+            raise HTTPException(status_code=400, detail=f"Invalid graph: unknown reducer '{reducer}' for node '{edge_node}'")
 
 
 @router.post("/create")
@@ -49,65 +74,160 @@ async def create_graph(definition: GraphDefinition) -> Dict[str, str]:
     """Create and store a graph; returns generated graph_id."""
     # Validate incoming definition first (fast-fail)
     validate_graph_definition(definition)
-    graph_id = str(uuid4())
-    # Minimal fix: overwrite graph_id inside stored GraphDefinition with server-generated id
-    # Use Pydantic v2 model_copy to update graph_id safely
-    clean_graph = definition.model_copy(update={"graph_id": graph_id})
+    graph_id = _new_id()
+    # Overwrite graph_id inside stored GraphDefinition with server-generated id.
+    # `definition` was already validated by FastAPI and validate_graph_definition,
+    # so model_construct skips a second validation pass. Never bypass validation
+    # for untrusted external data (e.g. the inbound state in /run).
+    clean_graph = GraphDefinition.model_construct(
+        graph_id=graph_id,
+        start_node=definition.start_node,
+        nodes=definition.nodes,
+        edges=definition.edges,
+    )
     graphs_store[graph_id] = clean_graph
+    exec_store[graph_id] = compile_graph(clean_graph)
     return {"graph_id": graph_id}
 
 
-@router.post("/run")
-async def run_graph_endpoint(payload: Dict[str, Any]) -> Dict[str, Any]:
+# Fields returned by /run; serialized in one pass via model_dump_json.
+_RUN_RESPONSE_FIELDS = {"run_id", "final_state", "log", "status"}
+
+
+def _json_response(run_ctx: RunContext, include: set) -> Response:
+    """Serialize selected RunContext fields straight to a JSON response."""
+    return Response(
+        content=run_ctx.model_dump_json(include=include, by_alias=True),
+        media_type="application/json",
+    )
+
+
+T = TypeVar("T")
+
+
+async def _decode_body(request: Request, body_type: Type[T]) -> T:
+    """Parse and validate an untrusted JSON body in one msgspec pass."""
+    try:
+        return msgspec.json.decode(await request.body(), type=body_type)
+    except msgspec.ValidationError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid request: {e}")
+    except msgspec.DecodeError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid JSON: {e}")
+
+
+# Request body schemas for /openapi.json: the bodies are decoded by msgspec from
+# the raw request, so FastAPI cannot infer them from the handler signature.
+_STATE_SCHEMA = WorkflowState.model_json_schema()
+_RUN_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/json": {
+                "schema": {
+                    "type": "object",
+                    "properties": {"graph_id": {"type": "string"}, "state": _STATE_SCHEMA},
+                    "required": ["graph_id", "state"],
+                }
+            }
+        },
+    }
+}
+
+
+@router.post("/run", openapi_extra=_RUN_BODY)
+async def run_graph_endpoint(request: Request) -> Response:
     """Run a graph by id with an initial workflow state."""
-    graph_id = payload.get("graph_id")
-    initial_state_data = payload.get("state")
+    payload = await _decode_body(request, RunRequest)
+    graph_id = payload.graph_id
 
     if not graph_id:
         raise HTTPException(status_code=400, detail="graph_id is required")
-    if initial_state_data is None:
+    if payload.state is None:
         raise HTTPException(status_code=400, detail="state is required")
 
     graph = graphs_store.get(graph_id)
     if graph is None:
         raise HTTPException(status_code=404, detail="Graph not found")
 
-    # Parse initial state
-    try:
-        initial_state = WorkflowState.model_validate(initial_state_data)
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Invalid state: {e}")
+    # State was validated by msgspec above, so no second Pydantic pass is needed
+    initial_state = payload.state.to_state()
 
-    run_id = str(uuid4())
+    run_id = _new_id()
     run_ctx = RunContext(run_id=run_id, graph_id=graph_id)
-    tools = ToolRegistry()
 
     # Execute graph
-    run_ctx = await run_graph(graph, initial_state, tools, run_ctx)
+    run_ctx = await run_graph(graph, initial_state, default_tools, run_ctx, exec_store.get(graph_id))
 
     # Persist run context
-    runs_store[run_id] = run_ctx
-
-    return {
-        "run_id": run_id,
-        "final_state": (run_ctx.final_state.model_dump() if run_ctx.final_state else {}),
-        "logs": run_ctx.log,
-        "status": run_ctx.status,
+    save_run(run_ctx)
+
+    return _json_response(run_ctx, _RUN_RESPONSE_FIELDS)
+
+
+# Max states per POST /graph/run_batch; keeps one request from flooding runs_store.
+MAX_BATCH = 100
+
+_RUN_BATCH_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/json": {
+                "schema": {
+                    "type": "object",
+                    "properties": {
+                        "graph_id": {"type": "string"},
+                        "states": {"type": "array", "items": _STATE_SCHEMA, "maxItems": MAX_BATCH},
+                    },
+                    "required": ["graph_id", "states"],
+                }
+            }
+        },
     }
+}
+
+
+@router.post("/run_batch", openapi_extra=_RUN_BATCH_BODY)
+async def run_batch(request: Request) -> Response:
+    """Run one graph concurrently for a list of up to MAX_BATCH initial states.
+
+    Returns a JSON list with one /run-shaped result per state, in input order.
+    """
+    payload = await _decode_body(request, RunBatchRequest)
+    graph_id = payload.graph_id
+
+    if not graph_id:
+        raise HTTPException(status_code=400, detail="graph_id is required")
+    if payload.states is None:
+        raise HTTPException(status_code=400, detail="states is required")
+    if len(payload.states) > MAX_BATCH:
+        raise HTTPException(status_code=400, detail=f"states exceeds the batch limit of {MAX_BATCH}")
+
+    graph = graphs_store.get(graph_id)
+    if graph is None:
+        raise HTTPException(status_code=404, detail="Graph not found")
+    exec_graph = exec_store.get(graph_id) or compile_graph(graph)
+
+    # Execute all runs concurrently, sharing the graph lookups and tool registry
+    run_ctxs = await asyncio.gather(
+        *[
+            run_graph(graph, state.to_state(), default_tools, RunContext(run_id=_new_id(), graph_id=graph_id), exec_graph)
+            for state in payload.states
+        ]
+    )
+
+    for run_ctx in run_ctxs:
+        save_run(run_ctx)
+
+    items = [run_ctx.model_dump_json(include=_RUN_RESPONSE_FIELDS, by_alias=True) for run_ctx in run_ctxs]
+    return Response(content=f"[{','.join(items)}]", media_type="application/json")
 
 
 @router.get("/state/{run_id}")
-async def get_run_state(run_id: str) -> Dict[str, Any]:
+async def get_run_state(run_id: str) -> Response:
     """Return serialized run context if exists."""
-    run_ctx = runs_store.get(run_id)
-    if run_ctx is None:
+    content = get_run_json(run_id)
+    if content is None:
         raise HTTPException(status_code=404, detail="Run not found")
-    # Minimal response: core run context only (no duplication of /graph/run output)
-    return {
-        "run_id": run_ctx.run_id,
-        "graph_id": run_ctx.graph_id,
-        "current_node": run_ctx.current_node,
-        "iteration": run_ctx.iteration,
-        "logs": run_ctx.log,
-        "status": run_ctx.status,
-    }
+    # Minimal response: core run context only (no duplication of /graph/run output),
+    # serialized once by save_run
+    return Response(content=content, media_type="application/json")
@@ -1,8 +1,9 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, FrozenSet, List, NamedTuple, Optional, Tuple
 
-from pydantic import BaseModel, Field
+import msgspec
+from pydantic import BaseModel, Field, PrivateAttr, SerializerFunctionWrapHandler, field_serializer
 
 
 class BranchCondition(BaseModel):
@@ -12,9 +13,17 @@ class BranchCondition(BaseModel):
 
 
 class EdgeDef(BaseModel):
-    """Edge definition with default next node and optional conditional branches."""
+    """Edge definition with default next node and optional conditional branches.
+
+    When `parallel` is set, the target of every branch whose condition holds is
+    run and the flow then resumes at `default_next` (directly, if none hold).
+    Several targets run concurrently on copies of the state, which are merged
+    by the named `reducer` (default: shallow merge in branch order).
+    """
     default_next: Optional[str] = None
     branches: List[BranchCondition] = Field(default_factory=list)
+    parallel: bool = False
+    reducer: Optional[str] = None
 
 
 class GraphDefinition(BaseModel):
@@ -24,6 +33,12 @@ class GraphDefinition(BaseModel):
     nodes: List[str]
     edges: Dict[str, EdgeDef]
 
+    # Node set cached once per graph (also runs after model_construct).
+    _node_set: FrozenSet[str] = PrivateAttr(default_factory=frozenset)
+
+    def model_post_init(self, __context: Any) -> None:
+        self._node_set = frozenset(self.nodes)
+
 
 class WorkflowState(BaseModel):
     """Shared workflow state passed between nodes."""
@@ -31,6 +46,42 @@ class WorkflowState(BaseModel):
     metadata: Dict[str, Any] = Field(default_factory=dict)
 
 
+class WorkflowStateMS(msgspec.Struct):
+    """msgspec mirror of WorkflowState, used to decode and validate inbound JSON fast."""
+    data: Dict[str, Any] = {}
+    metadata: Dict[str, Any] = {}
+
+    def to_state(self) -> WorkflowState:
+        """Convert to a WorkflowState; fields were already validated by msgspec."""
+        return WorkflowState.model_construct(data=self.data, metadata=self.metadata)
+
+
+class RunRequest(msgspec.Struct):
+    """Body of POST /graph/run; presence of fields is checked by the endpoint."""
+    graph_id: Optional[str] = None
+    state: Optional[WorkflowStateMS] = None
+
+
+class RunBatchRequest(msgspec.Struct):
+    """Body of POST /graph/run_batch; presence of fields is checked by the endpoint."""
+    graph_id: Optional[str] = None
+    states: Optional[List[WorkflowStateMS]] = None
+
+
+class LogEntry(NamedTuple):
+    """One execution log record; optional fields are omitted from JSON when unset."""
+    node: Optional[str]
+    iteration: int
+    event: str
+    changed_keys: Optional[Tuple[str, ...]] = None
+    error: Optional[str] = None
+    message: Optional[str] = None
+    state: Optional[Dict[str, Any]] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {k: v for k, v in self._asdict().items() if v is not None}
+
+
 class RunContext(BaseModel):
     """Run-time context tracking execution progress and logs."""
     run_id: str
@@ -38,6 +89,17 @@ class RunContext(BaseModel):
     current_node: Optional[str] = None
     iteration: int = 0
     status: str = "running"
-    log: List[Dict[str, Any]] = Field(default_factory=list)
+    # Exposed as "logs" in API responses (model_dump_json(by_alias=True)).
+    log: List[LogEntry] = Field(default_factory=list, serialization_alias="logs")
     final_state: Optional[WorkflowState] = None
 
+    @field_serializer("log")
+    def _serialize_log(self, log: List[LogEntry]) -> List[Dict[str, Any]]:
+        # Entries are converted to dicts only here, when the run is serialized
+        return [entry.as_dict() for entry in log]
+
+    @field_serializer("final_state", mode="wrap")
+    def _serialize_final_state(self, state: Optional[WorkflowState], handler: SerializerFunctionWrapHandler) -> Any:
+        # A run without a final state (e.g. a node returned None) is reported as {}
+        return {} if state is None else handler(state)
+
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
-from typing import Awaitable, Callable, Dict, Optional
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Optional, Union
 
 from app.engine.models import WorkflowState
 
@@ -20,8 +21,15 @@ class ToolRegistry:
         return self._tools.get(name)
 
 
+# Process-wide tool registry shared by all runs; tools are registered at import time.
+default_tools = ToolRegistry()
+
+
 # Node registry maps node names to async callables operating on WorkflowState.
+# Blocking or CPU-heavy sync functions can be registered with sync=True; they
+# are wrapped so they run in a worker thread instead of on the event loop.
 NodeFn = Callable[[WorkflowState, ToolRegistry], Awaitable[WorkflowState]]
+SyncNodeFn = Callable[[WorkflowState, ToolRegistry], WorkflowState]
 node_registry: Dict[str, NodeFn] = {}
 
 
@@ -30,11 +38,34 @@ ConditionFn = Callable[[WorkflowState], bool]
 condition_registry: Dict[str, ConditionFn] = {}
 
 
-def register_node(name: str, fn: NodeFn) -> None:
-    """Register an async node function by name."""
-    node_registry[name] = fn
+# Reducer registry maps reducer names to functions merging parallel branch results
+# (original state, branch states in branch order) into a single state.
+ReducerFn = Callable[[WorkflowState, List[WorkflowState]], WorkflowState]
+reducer_registry: Dict[str, ReducerFn] = {}
+
+
+def _run_in_thread(fn: SyncNodeFn) -> NodeFn:
+    """Wrap a sync node so it runs in a worker thread when awaited."""
+    async def run_in_thread(state: WorkflowState, tools: ToolRegistry) -> WorkflowState:
+        return await asyncio.to_thread(fn, state, tools)
+
+    return run_in_thread
+
+
+def register_node(name: str, fn: Union[NodeFn, SyncNodeFn], sync: bool = False) -> None:
+    """Register a node function by name.
+
+    Nodes are awaited by the runner; pass sync=True for a plain blocking
+    function, which is then run in a worker thread.
+    """
+    node_registry[name] = _run_in_thread(fn) if sync else fn
 
 
 def register_condition(name: str, fn: ConditionFn) -> None:
     """Register a condition function by name."""
     condition_registry[name] = fn
+
+
+def register_reducer(name: str, fn: ReducerFn) -> None:
+    """Register a parallel-branch reducer by name."""
+    reducer_registry[name] = fn
@@ -1,32 +1,217 @@
 from __future__ import annotations
 
-from typing import Optional
+import asyncio
+import os
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
 
-from app.engine.models import GraphDefinition, WorkflowState, RunContext, EdgeDef
-from app.engine.registry import node_registry, condition_registry, ToolRegistry
+from app.engine.models import GraphDefinition, LogEntry, WorkflowState, RunContext
+from app.engine.registry import (
+    ConditionFn,
+    NodeFn,
+    ReducerFn,
+    ToolRegistry,
+    condition_registry,
+    node_registry,
+    reducer_registry,
+)
 
 MAX_ITERATIONS = 20
 
+# Set DEBUG_SNAPSHOT=1 to log a full state snapshot after every node.
+DEBUG_SNAPSHOT = os.getenv("DEBUG_SNAPSHOT") == "1"
 
-def compute_next_node(edge: EdgeDef, state: WorkflowState, context: RunContext) -> Optional[str]:
+
+def _merge_changes(base: Dict[str, Any], results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Apply keys each result added or rebound (by identity vs base), in order."""
+    merged = dict(base)
+    for result in results:
+        for k, v in result.items():
+            if k not in base or base[k] is not v:
+                merged[k] = v
+    return merged
+
+
+def merge_branch_states(base: WorkflowState, results: List[WorkflowState]) -> WorkflowState:
+    """Default reducer: merge the keys each branch changed; later branches win.
+
+    Branches run on shallow copies of `base`, so keys a branch left untouched
+    still hold the base objects and do not overwrite another branch's writes.
+    """
+    return WorkflowState(
+        data=_merge_changes(base.data, [result.data for result in results]),
+        metadata=_merge_changes(base.metadata, [result.metadata for result in results]),
+    )
+
+
+# (condition name, resolved condition fn, target node)
+CompiledBranch = Tuple[str, ConditionFn, str]
+
+
+class ExecutableNode(NamedTuple):
+    """A graph node with its function, edge, and reducer resolved from the registries."""
+    fn: Optional[NodeFn]
+    has_edge: bool
+    branches: Tuple[CompiledBranch, ...]
+    default_next: Optional[str]
+    parallel: bool
+    reducer: Optional[ReducerFn]
+
+
+# Node name -> ExecutableNode; built once per graph by compile_graph.
+ExecutableGraph = Dict[str, ExecutableNode]
+
+
+def compile_graph(graph: GraphDefinition) -> ExecutableGraph:
+    """Resolve node, condition, and reducer lookups for a graph up front.
+
+    Registries are filled at import time, so the result stays valid for the
+    lifetime of the process. Missing nodes resolve to None (missing_node event
+    at run time); unknown conditions raise KeyError, as validated graphs never
+    contain them.
+
+    On sequential edges a condition repeated later in the branch list can never
+    win (it is false there, or its first occurrence already won), so repeats
+    are dropped here instead of being evaluated again at run time.
+    """
+    edges = graph.edges
+    exec_graph: ExecutableGraph = {}
+    for node in graph.nodes:
+        edge = edges.get(node)
+        if edge is None:
+            exec_graph[node] = ExecutableNode(node_registry.get(node), False, (), None, False, None)
+            continue
+        branches = edge.branches
+        if not edge.parallel:
+            seen = set()
+            branches = [b for b in branches if not (b.condition in seen or seen.add(b.condition))]
+        exec_graph[node] = ExecutableNode(
+            fn=node_registry.get(node),
+            has_edge=True,
+            branches=tuple((b.condition, condition_registry[b.condition], b.target) for b in branches),
+            default_next=edge.default_next,
+            parallel=edge.parallel,
+            reducer=reducer_registry.get(edge.reducer) if edge.reducer else merge_branch_states,
+        )
+    return exec_graph
+
+
+def compute_next_node(node: ExecutableNode, state: WorkflowState, context: RunContext) -> Optional[str]:
     """Compute the next node based on branch conditions or default_next.
 
     Returns the target node name or None if workflow should complete.
     """
-    # Evaluate branches in order; first truthy condition wins
-    for branch in edge.branches:
-        cond_fn = condition_registry.get(branch.condition)
-        if cond_fn is None:
-            # Beginner-level: silently skip missing conditions
-            continue
-        try:
-            if cond_fn(state):
-                return branch.target
-        except Exception:
-            # Beginner-level: silently skip on exceptions
-            continue
+    # Evaluate branches in order; first truthy condition wins. Conditions are
+    # checked at graph-create time, so there is no missing-condition or exception
+    # handling here; run_graph fails the run if one raises.
+    for _, cond_fn, target in node.branches:
+        if cond_fn(state):
+            return target
     # Fallback to default_next
-    return edge.default_next
+    return node.default_next
+
+
+def compute_parallel_targets(node: ExecutableNode, state: WorkflowState, context: RunContext) -> List[str]:
+    """Return the targets of every branch whose condition holds, in branch order.
+
+    A condition shared by several branches is evaluated once per call.
+    """
+    results: Dict[str, bool] = {}
+    targets = []
+    for name, cond_fn, target in node.branches:
+        holds = results.get(name)
+        if holds is None:
+            holds = results[name] = bool(cond_fn(state))
+        if holds:
+            targets.append(target)
+    return targets
+
+
+def _executed_entry(node: str, iteration: int, prev_values: Dict[str, Any], state: WorkflowState) -> LogEntry:
+    """Build the log entry for a successfully executed node.
+
+    `changed_keys` lists keys that were added or rebound to a different object.
+    Values are compared by identity, so in-place mutations (e.g. appending to an
+    existing list) and removed keys are not reported; use DEBUG_SNAPSHOT for those.
+    """
+    return LogEntry(
+        node=node,
+        iteration=iteration,
+        event="executed",
+        changed_keys=tuple(
+            sorted(k for k, v in state.data.items() if k not in prev_values or prev_values[k] is not v)
+        ),
+        # Full state snapshot for detailed debugging.
+        state=state.model_dump(mode="json") if DEBUG_SNAPSHOT else None,
+    )
+
+
+def _missing_node_entry(node: str, iteration: int) -> LogEntry:
+    return LogEntry(node, iteration, "missing_node", message=f"Node function '{node}' not found")
+
+
+async def _run_parallel(
+    targets: List[str],
+    reducer: Optional[ReducerFn],
+    exec_graph: ExecutableGraph,
+    state: WorkflowState,
+    tools: ToolRegistry,
+    context: RunContext,
+) -> Optional[WorkflowState]:
+    """Run the fan-out targets of a parallel edge and return the resulting state.
+
+    A single target runs directly on the state (no copies, no reducer). Several
+    targets run concurrently, each on its own shallow copy of data/metadata so
+    top-level writes do not interfere, and are merged by the reducer. Returns
+    None (with the run marked failed) on any error.
+    """
+    node_fns = []
+    for target in targets:
+        target_node = exec_graph.get(target)
+        if target_node is None or target_node.fn is None:
+            context.status = "failed"
+            context.log.append(_missing_node_entry(target, context.iteration))
+            return None
+        node_fns.append(target_node.fn)
+
+    prev_values = dict(state.data)
+    if len(node_fns) == 1:
+        try:
+            result = await node_fns[0](state, tools)
+            context.log.append(_executed_entry(targets[0], context.iteration, prev_values, result))
+        except Exception as exc:
+            context.status = "failed"
+            context.log.append(LogEntry(targets[0], context.iteration, "error", error=str(exc)))
+            return None
+        return result
+
+    copies = [
+        state.model_copy(update={"data": dict(state.data), "metadata": dict(state.metadata)})
+        for _ in targets
+    ]
+    results = await asyncio.gather(
+        *[node_fn(copy, tools) for node_fn, copy in zip(node_fns, copies)],
+        return_exceptions=True,
+    )
+
+    failed = False
+    for target, result in zip(targets, results):
+        if isinstance(result, BaseException):
+            failed = True
+            context.log.append(LogEntry(target, context.iteration, "error", error=str(result)))
+        else:
+            context.log.append(_executed_entry(target, context.iteration, prev_values, result))
+    if failed:
+        context.status = "failed"
+        return None
+
+    try:
+        if reducer is None:
+            raise LookupError("reducer not found")
+        return reducer(state, list(results))
+    except Exception as exc:
+        context.status = "failed"
+        context.log.append(LogEntry(context.current_node, context.iteration, "error", error=f"Reducer failed: {exc}"))
+        return None
 
 
 async def run_graph(
@@ -34,11 +219,17 @@ async def run_graph(
     initial_state: WorkflowState,
     tools: ToolRegistry,
     context: RunContext,
+    exec_graph: Optional[ExecutableGraph] = None,
 ) -> RunContext:
-    """Run a graph sequentially with branching, looping, and logging.
+    """Run a graph with branching, looping, and logging.
 
-    Execution stops on completion, failure, or max iteration threshold.
+    Nodes run sequentially, except for fan-outs on `parallel` edges, which
+    run concurrently (see EdgeDef). Execution stops on completion, failure,
+    or max iteration threshold. Pass a precompiled `exec_graph` (see
+    compile_graph) to skip compiling the graph for this run.
     """
+    if exec_graph is None:
+        exec_graph = compile_graph(graph)
     state = initial_state
     current = graph.start_node
     context.current_node = current
@@ -47,52 +238,49 @@ async def run_graph(
         context.iteration += 1
 
         # Fetch node function
-        node_fn = node_registry.get(current)
-        if node_fn is None:
+        node = exec_graph.get(current)
+        if node is None or node.fn is None:
             context.status = "failed"
-            context.log.append(
-                {
-                    "node": current,
-                    "iteration": context.iteration,
-                    "event": "missing_node",
-                    "message": f"Node function '{current}' not found",
-                }
-            )
+            context.log.append(_missing_node_entry(current, context.iteration))
             break
 
         # Execute node safely
         try:
-            state = await node_fn(state, tools)
+            # Shallow copy only: values are compared by identity afterwards
+            prev_values = dict(state.data)
+            state = await node.fn(state, tools)
             # Log after successful execution
-            context.log.append(
-                {
-                    "node": current,
-                    "iteration": context.iteration,
-                    "event": "executed",
-                    # Restoring full state snapshot for detailed debugging.
-                    "state": state.model_dump(),
-                }
-            )
+            context.log.append(_executed_entry(current, context.iteration, prev_values, state))
         except Exception as exc:
             context.status = "failed"
-            context.log.append(
-                {
-                    "node": current,
-                    "iteration": context.iteration,
-                    "event": "error",
-                    "error": str(exc),
-                }
-            )
+            context.log.append(LogEntry(current, context.iteration, "error", error=str(exc)))
             break
 
         # Resolve next node
-        edge = graph.edges.get(current)
-        if edge is None:
+        if not node.has_edge:
             # No edge configured for current node => workflow completes
             context.status = "completed"
             break
 
-        next_node = compute_next_node(edge, state, context)
+        try:
+            if node.parallel:
+                targets = compute_parallel_targets(node, state, context)
+            else:
+                next_node = compute_next_node(node, state, context)
+        except Exception as exc:
+            context.status = "failed"
+            context.log.append(LogEntry(current, context.iteration, "error", error=f"Condition failed: {exc}"))
+            break
+
+        if node.parallel:
+            if targets:
+                # Fan-out counts as one iteration; flow joins at default_next
+                context.iteration += 1
+                merged = await _run_parallel(targets, node.reducer, exec_graph, state, tools, context)
+                if merged is None:
+                    break
+                state = merged
+            next_node = node.default_next
         if next_node is None:
             context.status = "completed"
             break
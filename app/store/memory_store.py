@@ -1,12 +1,59 @@
 from __future__ import annotations
 
-from typing import Dict, Optional
+from collections import OrderedDict
+from typing import Generic, Optional, TypeVar
 
 from app.engine.models import GraphDefinition, RunContext
+from app.engine.runner import ExecutableGraph
 
-# In-memory stores; minimal and clean.
-graphs_store: Dict[str, GraphDefinition] = {}
-runs_store: Dict[str, RunContext] = {}
+K = TypeVar("K")
+V = TypeVar("V")
+
+MAX_GRAPHS = 10_000
+MAX_RUNS = 10_000
+
+
+class LRUStore(Generic[K, V]):
+    """Bounded dict-like store; evicts the least recently used entry when full."""
+
+    __slots__ = ("maxsize", "_items")
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self._items: "OrderedDict[K, V]" = OrderedDict()
+
+    def __setitem__(self, key: K, value: V) -> None:
+        self._items[key] = value
+        self._items.move_to_end(key)
+        if len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+
+    def __getitem__(self, key: K) -> V:
+        value = self._items[key]
+        self._items.move_to_end(key)
+        return value
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._items
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, key: K, default: Optional[V] = None) -> Optional[V]:
+        """Return the value for key (marking it recently used), or default."""
+        if key not in self._items:
+            return default
+        return self[key]
+
+
+# In-memory stores; minimal and clean. Graphs are kept as live objects (their
+# lookup caches are used by the runner). Finished runs never change, so they are
+# kept only as the pre-serialized GET /graph/state/{run_id} response body:
+# small, and served without any re-serialization.
+graphs_store: LRUStore[str, GraphDefinition] = LRUStore(MAX_GRAPHS)
+runs_store: LRUStore[str, bytes] = LRUStore(MAX_RUNS)
+# Precompiled graphs (see runner.compile_graph), keyed like graphs_store.
+exec_store: LRUStore[str, ExecutableGraph] = LRUStore(MAX_GRAPHS)
 
 
 def get_graph(graph_id: str) -> Optional[GraphDefinition]:
@@ -17,9 +64,13 @@ def save_graph(graph: GraphDefinition) -> None:
     graphs_store[graph.graph_id] = graph
 
 
-def get_run(run_id: str) -> Optional[RunContext]:
+# RunContext fields persisted for (and returned by) GET /graph/state/{run_id}.
+RUN_STATE_FIELDS = {"run_id", "graph_id", "current_node", "iteration", "log", "status"}
+
+
+def get_run_json(run_id: str) -> Optional[bytes]:
     return runs_store.get(run_id)
 
 
 def save_run(run: RunContext) -> None:
-    runs_store[run.run_id] = run
+    runs_store[run.run_id] = run.model_dump_json(include=RUN_STATE_FIELDS, by_alias=True).encode()
@@ -1,4 +1,17 @@
+import asyncio
+import threading
+
 import requests
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from app.api.routes import MAX_BATCH, validate_graph_definition
+from app.engine.models import BranchCondition, EdgeDef, GraphDefinition, RunContext, WorkflowState
+from app.engine.registry import default_tools, register_condition, register_node, register_reducer
+from app.engine.runner import run_graph
+from app.main import app
+from app.store.memory_store import LRUStore
+from app.workflows.code_review import extract_functions
 
 BASE = "http://localhost:8000"
 
@@ -51,7 +64,8 @@ def main():
     run_id = run_out["run_id"]
     status = run_out.get("status")
     final_state = run_out.get("final_state")
-    # Runner stores full snapshots under key 'log' (not 'logs'). Support both for compatibility.
+    # Responses expose the run log under 'logs' (entries carry changed_keys, not full snapshots).
+    # Support 'log' too for compatibility.
     logs = run_out.get("log") or run_out.get("logs", [])
     print("Run status:", status)
     print("Run ID:", run_id)
@@ -73,11 +87,348 @@ def main():
     # GET /graph/state returns minimal fields and uses 'log' key
     fetched_log = state_out.get("log") or state_out.get("logs", [])
     assert isinstance(fetched_log, list), "log in GET should be a list"
-    # Conditions are handled silently now; only 'executed' events are expected
+    # Conditions are validated at create time; only 'executed' events are expected
     assert any(entry.get("event") == "executed" for entry in fetched_log), (
         "log should include at least one executed event"
     )
 
+    # 4) Run a batch: one result per state, in input order, each fetchable via GET /state
+    batch_codes = ["def a():\n    pass", "def b(x):\n    return x", ""]
+    batch_states = [{"data": {"code": code, "quality_threshold": 75}} for code in batch_codes]
+    r4 = requests.post(f"{BASE}/graph/run_batch", json={"graph_id": graph_id, "states": batch_states})
+    r4.raise_for_status()
+    batch_out = r4.json()
+    print("Batch statuses:", [item.get("status") for item in batch_out])
+    assert isinstance(batch_out, list) and len(batch_out) == len(batch_states), "one result per state expected"
+    assert [item["final_state"]["data"]["code"] for item in batch_out] == batch_codes, "results out of order"
+    batch_run_ids = [item["run_id"] for item in batch_out]
+    assert len(set(batch_run_ids)) == len(batch_run_ids), "batched runs must have distinct run_ids"
+    for batch_run_id in batch_run_ids:
+        r5 = requests.get(f"{BASE}/graph/state/{batch_run_id}")
+        r5.raise_for_status()
+        assert r5.json()["run_id"] == batch_run_id
+
+    # Oversized batches are rejected
+    r6 = requests.post(f"{BASE}/graph/run_batch", json={"graph_id": graph_id, "states": [{}] * (MAX_BATCH + 1)})
+    assert r6.status_code == 400, "batch above MAX_BATCH should be rejected"
+
+
+# ----------------------
+# In-process engine checks (no server needed): python -m pytest app/test_api.py
+# ----------------------
+
+def _mark(name):
+    async def node(state, tools):
+        state.data[name] = True
+        return state
+    return node
+
+
+for _name in ("p_start", "p_a", "p_b", "p_join"):
+    register_node(_name, _mark(_name))
+register_condition("p_want_a", lambda state: state.data.get("want_a", False))
+register_condition("p_want_b", lambda state: state.data.get("want_b", False))
+
+
+def _write_winner(name):
+    async def node(state, tools):
+        state.data["winner"] = name
+        return state
+    return node
+
+
+_events = {}
+
+
+def _rendezvous(name, other):
+    # Completes only if the other branch runs at the same time
+    async def node(state, tools):
+        _events.setdefault(name, asyncio.Event()).set()
+        await asyncio.wait_for(_events.setdefault(other, asyncio.Event()).wait(), timeout=1)
+        state.data[name] = True
+        return state
+    return node
+
+
+async def _fail(state, tools):
+    raise RuntimeError("branch exploded")
+
+
+def _boom_reducer(base, results):
+    raise ValueError("cannot merge")
+
+
+def _first_wins(base, results):
+    return results[0]
+
+
+async def _rebind_x(state, tools):
+    state.data["x"] = 2
+    state.metadata["m"] = "a"
+    return state
+
+
+async def _set_y(state, tools):
+    state.data["y"] = 3
+    return state
+
+
+register_node("p_rebind_x", _rebind_x)
+register_node("p_set_y", _set_y)
+register_node("p_win_a", _write_winner("p_win_a"))
+register_node("p_win_b", _write_winner("p_win_b"))
+register_node("p_meet_a", _rendezvous("p_meet_a", "p_meet_b"))
+register_node("p_meet_b", _rendezvous("p_meet_b", "p_meet_a"))
+register_node("p_fail", _fail)
+register_reducer("p_boom", _boom_reducer)
+register_reducer("p_first_wins", _first_wins)
+
+
+def _run(graph, data):
+    ctx = RunContext(run_id="test", graph_id=graph.graph_id)
+    return asyncio.run(run_graph(graph, WorkflowState(data=data), default_tools, ctx))
+
+
+def _fan_out_graph(a="p_a", b="p_b", reducer=None):
+    return GraphDefinition(
+        graph_id="fan_out",
+        start_node="p_start",
+        nodes=["p_start", a, b, "p_join"],
+        edges={
+            "p_start": EdgeDef(
+                parallel=True,
+                reducer=reducer,
+                default_next="p_join",
+                branches=[
+                    BranchCondition(condition="p_want_a", target=a),
+                    BranchCondition(condition="p_want_b", target=b),
+                ],
+            ),
+        },
+    )
+
+
+def test_parallel_edge_always_joins_at_default_next():
+    graph = _fan_out_graph()
+    cases = [
+        ({}, ["p_start", "p_join"]),
+        ({"want_a": True}, ["p_start", "p_a", "p_join"]),
+        ({"want_a": True, "want_b": True}, ["p_start", "p_a", "p_b", "p_join"]),
+    ]
+    for data, expected in cases:
+        ctx = _run(graph, data)
+        assert ctx.status == "completed", ctx.log
+        assert [entry.node for entry in ctx.log] == expected
+        for node in expected:
+            assert ctx.final_state.data[node] is True
+
+
+def test_parallel_branches_run_concurrently():
+    _events.clear()
+    ctx = _run(_fan_out_graph("p_meet_a", "p_meet_b"), {"want_a": True, "want_b": True})
+    assert ctx.status == "completed", ctx.log
+    assert ctx.final_state.data["p_meet_a"] and ctx.final_state.data["p_meet_b"]
+    # Both branches are logged under the single fan-out iteration
+    assert {entry.iteration for entry in ctx.log if entry.node.startswith("p_meet")} == {2}
+
+
+def test_default_reducer_later_branch_wins():
+    ctx = _run(_fan_out_graph("p_win_a", "p_win_b"), {"want_a": True, "want_b": True})
+    assert ctx.status == "completed", ctx.log
+    assert ctx.final_state.data["winner"] == "p_win_b"
+    assert ctx.final_state.data["p_join"] is True
+
+
+def test_default_reducer_keeps_rebound_key_untouched_by_later_branch():
+    graph = _fan_out_graph("p_rebind_x", "p_set_y")
+    ctx = asyncio.run(
+        run_graph(
+            graph,
+            WorkflowState(data={"x": 1, "want_a": True, "want_b": True}, metadata={"m": "base"}),
+            default_tools,
+            RunContext(run_id="test", graph_id=graph.graph_id),
+        )
+    )
+    assert ctx.status == "completed", ctx.log
+    assert ctx.final_state.data["x"] == 2
+    assert ctx.final_state.data["y"] == 3
+    assert ctx.final_state.metadata["m"] == "a"
+
+
+def test_named_reducer_from_registry():
+    ctx = _run(_fan_out_graph("p_win_a", "p_win_b", reducer="p_first_wins"), {"want_a": True, "want_b": True})
+    assert ctx.status == "completed", ctx.log
+    assert ctx.final_state.data["winner"] == "p_win_a"
+
+
+def test_failing_branch_fails_run():
+    ctx = _run(_fan_out_graph("p_a", "p_fail"), {"want_a": True, "want_b": True})
+    assert ctx.status == "failed"
+    errors = [entry for entry in ctx.log if entry.event == "error"]
+    assert [(entry.node, entry.error) for entry in errors] == [("p_fail", "branch exploded")]
+    assert "p_join" not in [entry.node for entry in ctx.log]
+
+
+def test_failing_reducer_fails_run():
+    ctx = _run(_fan_out_graph(reducer="p_boom"), {"want_a": True, "want_b": True})
+    assert ctx.status == "failed"
+    assert ctx.log[-1].event == "error"
+    assert ctx.log[-1].error == "Reducer failed: cannot merge"
+
+
+def test_unknown_reducer_rejected():
+    try:
+        validate_graph_definition(_fan_out_graph(reducer="p_missing"))
+    except HTTPException as exc:
+        assert exc.status_code == 400
+        assert "unknown reducer 'p_missing'" in exc.detail
+    else:
+        raise AssertionError("unknown reducer was accepted")
+
+
+def test_unknown_condition_rejected():
+    graph = GraphDefinition(
+        graph_id="unknown_condition",
+        start_node="p_start",
+        nodes=["p_start", "p_a"],
+        edges={"p_start": EdgeDef(branches=[BranchCondition(condition="p_no_such_condition", target="p_a")])},
+    )
+    try:
+        validate_graph_definition(graph)
+    except HTTPException as exc:
+        assert exc.status_code == 400
+        assert "unknown condition 'p_no_such_condition'" in exc.detail
+    else:
+        raise AssertionError("unknown condition was accepted")
+
+
+def _raising_condition(state):
+    raise KeyError("quality_score")
+
+
+register_condition("p_raises", _raising_condition)
+
+
+def test_raising_condition_fails_run():
+    graph = GraphDefinition(
+        graph_id="raising_condition",
+        start_node="p_start",
+        nodes=["p_start", "p_a"],
+        edges={"p_start": EdgeDef(branches=[BranchCondition(condition="p_raises", target="p_a")])},
+    )
+    ctx = _run(graph, {})
+    assert ctx.status == "failed"
+    assert [entry.node for entry in ctx.log] == ["p_start", "p_start"]
+    assert ctx.log[-1].event == "error"
+    assert ctx.log[-1].error == "Condition failed: 'quality_score'"
+
+
+class _AsyncCallable:
+    # Not a coroutine function, but awaitable when called: must not go to a thread
+    async def __call__(self, state, tools):
+        state.data["callable_ran"] = True
+        return state
+
+
+def _blocking_node(state, tools):
+    state.data["thread"] = threading.current_thread() is not threading.main_thread()
+    return state
+
+
+register_node("s_callable", _AsyncCallable())
+register_node("s_blocking", _blocking_node, sync=True)
+
+
+def test_async_callable_node_is_awaited():
+    graph = GraphDefinition(graph_id="callable", start_node="s_callable", nodes=["s_callable"], edges={})
+    ctx = _run(graph, {})
+    assert ctx.status == "completed", ctx.log
+    assert ctx.final_state.data["callable_ran"] is True
+
+
+def test_sync_node_runs_in_thread():
+    graph = GraphDefinition(graph_id="blocking", start_node="s_blocking", nodes=["s_blocking"], edges={})
+    ctx = _run(graph, {})
+    assert ctx.status == "completed", ctx.log
+    assert ctx.final_state.data["thread"] is True
+
+
+def test_extract_functions_finds_sync_async_and_methods():
+    code = "def a():\n    pass\n\nasync def b(x):\n    return x\n\nclass C:\n    def m(self):\n        pass\n"
+    state = asyncio.run(extract_functions(WorkflowState(data={"code": code}), default_tools))
+    assert state.data["functions"] == ["a", "b", "m"]
+
+
+_condition_calls = []
+
+
+def _counted_want_a(state):
+    _condition_calls.append(1)
+    return state.data.get("want_a", False)
+
+
+register_condition("p_counted", _counted_want_a)
+
+
+def test_shared_condition_evaluated_once_per_edge():
+    for parallel in (False, True):
+        _condition_calls.clear()
+        graph = GraphDefinition(
+            graph_id="shared",
+            start_node="p_start",
+            nodes=["p_start", "p_a", "p_b", "p_join"],
+            edges={
+                "p_start": EdgeDef(
+                    parallel=parallel,
+                    default_next="p_join",
+                    branches=[
+                        BranchCondition(condition="p_counted", target="p_a"),
+                        BranchCondition(condition="p_counted", target="p_b"),
+                    ],
+                ),
+            },
+        )
+        ctx = _run(graph, {"want_a": parallel})
+        assert ctx.status == "completed", ctx.log
+        assert len(_condition_calls) == 1
+        expected = ["p_start", "p_a", "p_b", "p_join"] if parallel else ["p_start", "p_join"]
+        assert [entry.node for entry in ctx.log] == expected
+
+
+def test_lru_store_evicts_least_recently_used():
+    store = LRUStore(maxsize=2)
+    store["a"] = 1
+    store["b"] = 2
+    assert store.get("a") == 1  # marks "a" as recently used
+    store["c"] = 3
+    assert "b" not in store
+    assert store.get("a") == 1 and store["c"] == 3
+    assert len(store) == 2
+    assert store.get("b") is None
+
+
+def test_run_batch_endpoint():
+    client = TestClient(app)
+    graph_id = client.post("/graph/create", json=graph_def).json()["graph_id"]
+    codes = ["def a():\n    pass", "async def b():\n    pass", ""]
+    states = [{"data": {"code": code, "quality_threshold": 75}} for code in codes]
+
+    r = client.post("/graph/run_batch", json={"graph_id": graph_id, "states": states})
+    assert r.status_code == 200, r.text
+    results = r.json()
+    assert [item["final_state"]["data"]["code"] for item in results] == codes
+    run_ids = [item["run_id"] for item in results]
+    assert len(set(run_ids)) == len(codes)
+    for run_id in run_ids:
+        assert client.get(f"/graph/state/{run_id}").json()["run_id"] == run_id
+
+    r = client.post("/graph/run_batch", json={"graph_id": graph_id, "states": []})
+    assert r.status_code == 200 and r.json() == []
+
+    r = client.post("/graph/run_batch", json={"graph_id": graph_id, "states": [{}] * (MAX_BATCH + 1)})
+    assert r.status_code == 400
+    assert str(MAX_BATCH) in r.json()["detail"]
+
 
 if __name__ == "__main__":
     main()
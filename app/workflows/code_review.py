@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import re
 from typing import List
 
 from app.engine.models import WorkflowState, GraphDefinition, EdgeDef, BranchCondition
@@ -10,18 +11,14 @@ from app.engine.registry import register_node, register_condition, ToolRegistry
 # Node implementations
 # ----------------------
 
+# Matches `def name(` / `async def name(` at the start of a (possibly indented) line.
+_DEF_RE = re.compile(r"^\s*(?:async\s+)?def\s+([A-Za-z_]\w*)\s*\(", re.MULTILINE)
+
+
 async def extract_functions(state: WorkflowState, tools: ToolRegistry) -> WorkflowState:
     code: str = state.data.get("code", "")
-    # Very naive mock: split by 'def ' and count
-    functions: List[str] = []
-    for chunk in code.split("def "):
-        name = chunk.split("(")[0].strip()
-        if name and "\n" not in name:
-            functions.append(name)
-    # Remove possible preamble part
-    if functions and not code.startswith("def "):
-        functions = functions[1:]
-    state.data["functions"] = functions
+    # Naive mock: collect function names in a single regex pass
+    state.data["functions"] = _DEF_RE.findall(code)
     return state
 
 
@@ -0,0 +1,13 @@
+#!/usr/bin/env sh
+# Launch the API with multiple Uvicorn worker processes.
+#
+# Async nodes share one event loop per process, so CPU-heavy pipelines only
+# scale across cores with more workers. Nodes registered with sync=True run in
+# a thread, which keeps the event loop responsive but adds no cores.
+#
+# Graphs and runs live in per-process memory: with WORKERS > 1, put a sticky
+# load balancer in front or a graph created on one worker will not be found by
+# another.
+#
+# Usage: WORKERS=4 PORT=8000 ./serve.sh
+exec uvicorn app.main:app --host "${HOST:-0.0.0.0}" --port "${PORT:-8000}" --workers "${WORKERS:-1}"
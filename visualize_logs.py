@@ -6,7 +6,8 @@ or printed by test_api.py) and prints a clean summary table:
 
 Iteration | Node | Event | Keys Changed
 
-- Keys Changed is computed by diffing consecutive `state.data` dicts.
+- Keys Changed comes from each entry's `changed_keys` list, emitted by the runner.
+- Legacy logs with full `state` snapshots are diffed between consecutive entries.
 - Only standard Python is used; no third-party libraries.
 
 Usage:
@@ -19,13 +20,13 @@ Where `run_output.json` contains a JSON object with a `logs` field like:
       "node": "extract_functions",
       "iteration": 1,
       "event": "executed",
-      "state": {"data": {"functions": ["foo", "bar"]}, "metadata": {}}
+      "changed_keys": ["functions"]
     },
     ...
   ]
 }
 
-Notes:
+Notes (legacy snapshot logs only):
 - The diff is computed between consecutive entries in logs.
 - For the first entry, Keys Changed lists keys present in its `state.data`.
 - A key counts as changed if it is added or its value differs by !=.
@@ -45,6 +46,8 @@ def _dict_diff_keys(prev: Dict[str, Any], curr: Dict[str, Any]) -> Set[str]:
     - Changed: key present in both but with different values according to !=.
     - Removed keys are ignored for this summary (focus on additions/changes).
     """
+    if prev is curr:
+        return set()
     changed: Set[str] = set()
     prev_keys = set(prev.keys()) if prev else set()
     curr_keys = set(curr.keys()) if curr else set()
@@ -55,7 +58,10 @@ def _dict_diff_keys(prev: Dict[str, Any], curr: Dict[str, Any]) -> Set[str]:
 
     # Changed values for common keys
     for k in (curr_keys & prev_keys):
-        if prev.get(k) != curr.get(k):
+        prev_val = prev[k]
+        curr_val = curr[k]
+        # Identity check first avoids deep equality on shared nested values
+        if prev_val is not curr_val and prev_val != curr_val:
             changed.add(k)
 
     return changed
@@ -96,6 +102,12 @@ def main() -> None:
         iteration = entry.get("iteration", "-")
         node = entry.get("node", "-")
         event = entry.get("event", "-")
+
+        changed_keys = entry.get("changed_keys")
+        if changed_keys is not None:
+            print(_format_row(iteration, node, event, set(changed_keys)))
+            continue
+
         state = entry.get("state") or {}
         curr_data = (state.get("data") or {}) if isinstance(state, dict) else {}
 